@@ -1,7 +1,7 @@
 
 import pandas as pd
+import numpy as np
 import datetime as dt
-import ast
 import re
 
 def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFrame, df_onb: pd.DataFrame, prev_assignments: pd.DataFrame, df_vastrooster: pd.DataFrame, num_weeks: int = 4):
@@ -23,21 +23,19 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
     # Keep only rows where actie == 'plannen'
     df_shifts = df_rooster_template[df_rooster_template["actie"].str.lower() == "plannen"].copy()
     df_shifts = df_shifts.reset_index(drop=True)
+    # Shift names are few and repeated for every day/week: store them as categorical
+    df_shifts["Shifts"] = df_shifts["Shifts"].astype("category")
 
     # Convert "Ja"/"Facultatief"/"Nee" → 1/0.5/0
     day_cols = ["Maandag","Dinsdag","Woensdag","Donderdag","Vrijdag","Zaterdag","Zondag"]
-    def convert_day_value(x):
-        if str(x).strip().lower() == "ja":
-            return 1
-        elif str(x).strip().lower() == "facultatief":
-            return 0.5
-        else:
-            return 0
-    for col in day_cols:
-        df_shifts[col] = df_shifts[col].apply(convert_day_value)
-    # Convert time strings into datetime.time
-    df_shifts["Begintijd"] = pd.to_datetime(df_shifts["Begintijd"], format="%H:%M:%S").dt.time
-    df_shifts["Eindtijd"] = pd.to_datetime(df_shifts["Eindtijd"], format="%H:%M:%S").dt.time
+    day_value_map = {"ja": 1, "facultatief": 0.5}
+    day_values = df_shifts[day_cols].astype(str).apply(lambda c: c.str.strip().str.lower())
+    df_shifts[day_cols] = day_values.apply(lambda c: c.map(day_value_map).fillna(0))
+    # Parse time strings once, keep the datetime64 values for the duration and expose datetime.time
+    begin_dt = pd.to_datetime(df_shifts["Begintijd"], format="%H:%M:%S")
+    end_dt = pd.to_datetime(df_shifts["Eindtijd"], format="%H:%M:%S")
+    df_shifts["Begintijd"] = begin_dt.dt.time
+    df_shifts["Eindtijd"] = end_dt.dt.time
     
     # if deskundigheid is a string with , split into list of ints, else convert to int (e.g. 1. Verpleegkundige, 2. Verzorgende → [1,2], 2. Verzorgende → [2])
     def parse_desk(x):
@@ -53,47 +51,50 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
     df_shifts["Deskundigheid"] = df_shifts["Deskundigheid"].apply(parse_desk)
     
     # Compute duration in hours
-    df_shifts["Duur"] = (
-        pd.to_datetime(df_shifts["Eindtijd"].astype(str)) -
-        pd.to_datetime(df_shifts["Begintijd"].astype(str))
-    ).dt.total_seconds() / 3600
+    duur = (end_dt - begin_dt).dt.total_seconds() / 3600
 
     # Fix negative durations (crosses midnight)
+    df_shifts["Duur"] = np.where(duur < 0, duur + 24, duur)
+
+    # Shift type flags per template row, from the times as seconds since midnight
+    start_sec = (begin_dt - begin_dt.dt.normalize()).dt.total_seconds().to_numpy()
+    end_sec = (end_dt - end_dt.dt.normalize()).dt.total_seconds().to_numpy()
 
-    df_shifts.loc[df_shifts["Duur"] < 0, "Duur"] += 24
+    # is_night: end_time < start_time (crosses midnight)
+    df_shifts["is_night"] = end_sec < start_sec
+    # is_evening: start time >= 12:00 and positive difference between start_time and end_time
+    df_shifts["is_evening"] = (start_sec >= 12 * 3600) & (end_sec > start_sec)
+    # is_day: start time < 12:00 and positive difference between start_time and end_time
+    df_shifts["is_day"] = (start_sec < 12 * 3600) & (end_sec > start_sec)
 
     # Convert to long format: each row = one shift on one day
     days = ['Maandag', 'Dinsdag', 'Woensdag', 'Donderdag', 'Vrijdag', 'Zaterdag', 'Zondag']
     day_map = {day: i for i, day in enumerate(days)}  # Map day names to day indices (0–6)
 
-    shift_requirements = []
-
-    for idx, row in df_shifts.iterrows():
-        for day in days:
-            if row[day] == 1:  # If this shift needs to be filled on this day
-                shift_requirements.append({
-                    "shift_name": row['Shifts'],
-                    "day_of_week": day_map[day],  # 0=Monday, etc.
-                    "start_time": row['Begintijd'],
-                    "end_time": row['Eindtijd'],
-                    "qualification": row['Deskundigheid'],
-                    "duration": row['Duur'],
-                    "required": 1
-                })
-            elif row[day] == 0.5:  # Facultatief
-                shift_requirements.append({
-                    "shift_name": row['Shifts'],
-                    "day_of_week": day_map[day],  # 0=Monday, etc.
-                    "start_time": row['Begintijd'],
-                    "end_time": row['Eindtijd'],
-                    "qualification": row['Deskundigheid'],
-                    "duration": row['Duur'],
-                    "required": 0.5
-                })
+    # Melt the day columns into rows, keep the days where the shift is needed (1) or facultatief (0.5)
+    df_long = df_shifts.melt(
+        id_vars=['Shifts', 'Begintijd', 'Eindtijd', 'Deskundigheid', 'Duur', 'is_day', 'is_evening', 'is_night'],
+        value_vars=days, var_name='day', value_name='required', ignore_index=False
+    )
+    df_long = df_long[df_long['required'] > 0]
+    df_long['day_of_week'] = df_long['day'].map(day_map)  # 0=Monday, etc.
+
+    # Keep the template order: per shift, Monday → Sunday
+    df_long = df_long.rename_axis('template_row').reset_index()
+    df_long = df_long.sort_values(['template_row', 'day_of_week'], kind='stable')
+    df_long = df_long.rename(columns={
+        'Shifts': 'shift_name',
+        'Begintijd': 'start_time',
+        'Eindtijd': 'end_time',
+        'Deskundigheid': 'qualification',
+        'Duur': 'duration'
+    })
+
+    shift_requirements = df_long[['shift_name', 'day_of_week', 'start_time', 'end_time', 'qualification', 'duration', 'required', 'is_day', 'is_evening', 'is_night']].reset_index(drop=True)
 
     ### Previous assignments processing ###
     if prev_assignments is not None and not prev_assignments.empty:
-        df = prev_assignments.copy()
+        df = prev_assignments  # no copy: rename() below returns a new frame before any column is assigned
 
         #drop medewerker id if exists
         if 'Medewerker id' in df.columns:
@@ -109,25 +110,28 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
             "Dienst eindtijd": "end_time"
         })
 
-        # --- 2. Parse dates and times ---
-        df["shift_date"] = pd.to_datetime(df["shift_date"], dayfirst=True)
-        df["start_time"] = pd.to_datetime(df["start_time"], format="%H:%M").dt.time
-        df["end_time"] = pd.to_datetime(df["end_time"], format="%H:%M").dt.time
+        # --- 2. Parse dates and times (once, with explicit formats) ---
+        try:
+            df["shift_date"] = pd.to_datetime(df["shift_date"], format="%d-%m-%Y")
+        except ValueError:
+            # Other day-first notations (e.g. 01/03/2025) fall back to inference
+            df["shift_date"] = pd.to_datetime(df["shift_date"], dayfirst=True)
+        start_dt = pd.to_datetime(df["start_time"], format="%H:%M")
+        end_dt = pd.to_datetime(df["end_time"], format="%H:%M")
+        df["start_time"] = start_dt.dt.time
+        df["end_time"] = end_dt.dt.time
 
         # --- 3. Add scheduler fields ---
         df["shift_id"] = range(len(df))
-        df['is_night'] = df['start_time'].apply(lambda t: t.hour >= 22 or t.hour < 6)
+        df['is_night'] = (start_dt.dt.hour >= 22) | (start_dt.dt.hour < 6)
         df["shift_filled"] = True
         df["qualification"] = pd.NA
         df["deskundigheid"] = pd.NA
 
         # Duration in minutes
-        df["duration_min"] = (
-            pd.to_datetime(df["end_time"].astype(str)) -
-            pd.to_datetime(df["start_time"].astype(str))
-        ).dt.total_seconds() / 60
+        duration_min = (end_dt - start_dt).dt.total_seconds() / 60
         # Fix negative durations (crosses midnight)
-        df.loc[df["duration_min"] < 0, "duration_min"] += 24 * 60
+        df["duration_min"] = np.where(duration_min < 0, duration_min + 24 * 60, duration_min)
 
         # --- 4. Compute day_of_week and absolute_day ---
         df = df.sort_values("shift_date").reset_index(drop=True)
@@ -154,20 +158,22 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
         global_start_date = start_date
     
     
-    all_shift_instances = []
-    for week in range(num_weeks):
-        for row in shift_requirements:
-            shift_date = start_date + dt.timedelta(days=week * 7 + row["day_of_week"])
-            global_week = (shift_date.normalize() - global_start_date).days // 7 + 1
-            all_shift_instances.append({
-                **row,
-                "week": week + 1,
-                "absolute_day": week * 7 + row["day_of_week"],
-                "shift_date": shift_date,
-                "global_week": global_week
-            })
-
-    shifts = pd.DataFrame(all_shift_instances)
+    # Repeat the weekly requirements for every week in the horizon (week-major order)
+    # Columns are built as whole arrays and handed to the DataFrame constructor once
+    n_req = len(shift_requirements)
+    req_idx = np.tile(np.arange(n_req), num_weeks)
+    week = np.repeat(np.arange(1, num_weeks + 1), n_req)
+    absolute_day = (week - 1) * 7 + shift_requirements['day_of_week'].to_numpy()[req_idx]
+    shift_date = start_date + pd.to_timedelta(absolute_day, unit='D')
+    shift_columns = {col: shift_requirements[col].array.take(req_idx) for col in shift_requirements.columns}
+    shift_columns.update({
+        'week': week,
+        'absolute_day': absolute_day,
+        'shift_date': shift_date,
+        'global_week': (shift_date.normalize() - global_start_date).days.to_numpy() // 7 + 1,
+    })
+    shifts = pd.DataFrame(shift_columns)
+
     shifts['shift_id'] = shifts.index.astype(int)    
     
     # Convert durations (hours → minutes, integers for CP-SAT)
@@ -177,43 +183,10 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
     shifts['week'] = shifts['week'].astype(int)
     shifts['day_of_week'] = shifts['day_of_week'].astype(int)
 
-    # Day key for grouping
-    shifts['day_key'] = list(zip(shifts['week'], shifts['day_of_week']))
-    
-    # add is_night based on the difference between start_time and end_time being negative
-    # compute per-shift whether end_time < start_time (crosses midnight)
-    shifts['is_night'] = (
-        pd.to_datetime(shifts['end_time'].astype(str)) -
-        pd.to_datetime(shifts['start_time'].astype(str))
-    ) < pd.Timedelta(0)
-    shifts['is_night'] = shifts['is_night'].astype(bool)
-    shifts['shift_id'] = shifts.index.astype(int)
-
-    # add is_evening based on start time being >= 12:00, and difference between start_time and end_time being positive
-    shifts['is_evening'] = (
-        (pd.to_datetime(shifts['start_time'].astype(str)).dt.hour >= 12) &
-        ((pd.to_datetime(shifts['end_time'].astype(str)) -
-          pd.to_datetime(shifts['start_time'].astype(str))) > pd.Timedelta(0))
-    )
-    shifts['is_evening'] = shifts['is_evening'].astype(bool)
-    shifts['shift_id'] = shifts.index.astype(int)
+    shifts = shifts[['shift_id', 'shift_name', 'shift_date', 'week', 'global_week', 'day_of_week', 'absolute_day', 'start_time', 'end_time', 'duration_min', 'qualification','is_day', 'is_evening', 'is_night', 'required']]
     
-    # add is_day based on start time being < 12:00, and difference between start_time and end_time being positive
-    shifts['is_day'] = (
-        (pd.to_datetime(shifts['start_time'].astype(str)).dt.hour < 12) &
-        ((pd.to_datetime(shifts['end_time'].astype(str)) -
-          pd.to_datetime(shifts['start_time'].astype(str))) > pd.Timedelta(0))
-    )
-    
-    shifts['qualification'] = shifts['qualification'].apply(
-        lambda q: ast.literal_eval(q) if isinstance(q, str) else q)
-    
-    shifts = shifts[['shift_id', 'shift_name', 'shift_date', 'week', 'global_week', 'day_of_week', 'absolute_day', 'start_time', 'end_time', 'duration_min', 'qualification','is_day', 'is_evening', 'is_night', 'day_key', 'required']]
-    
-    shifts_constant = shifts.copy()
-    # Remove all shifts where shift_name = KOK or FM
-    shifts_constant = shifts_constant[shifts_constant['shift_name'].isin(['KOK', 'FM'])]
-    shifts_constant = shifts_constant.reset_index(drop=True)
+    # Keep only the KOK and FM shifts for the constant schedule
+    shifts_constant = shifts.loc[shifts['shift_name'].isin(['KOK', 'FM'])].reset_index(drop=True)
     shifts_constant['shift_id'] = shifts_constant.index.astype(int)
     
     shifts = shifts[~shifts['shift_name'].isin(['KOK', 'FM'])]
@@ -222,18 +195,16 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
     
     # if prev_assignments is None, copy shifts to prev_assignments with correct date range (4 weeks before start_date)
     if prev_assignments is None or prev_assignments.empty:
-        prev_assignments = shifts.copy()
         # Change date range to 4 weeks before start_date
-        prev_assignments = prev_assignments[prev_assignments['shift_date'] < start_date]
-        prev_assignments = prev_assignments[prev_assignments['shift_date'] >= start_date - pd.to_timedelta(28, unit='D')]
+        in_prev_range = (shifts['shift_date'] < start_date) & (shifts['shift_date'] >= start_date - pd.to_timedelta(28, unit='D'))
+        prev_assignments = shifts.loc[in_prev_range].reset_index(drop=True)
         #-4 on global_week due to starting 4 weeks earlier
         prev_assignments['global_week'] -= 4
-        prev_assignments = prev_assignments.reset_index(drop=True)
         prev_assignments['employee_id'] = pd.NA  # No assignments yet
     
     print('Shift data loaded')
     # --- Workers ---
-    workers = df_werknemers.copy().reset_index(drop=True)
+    workers = df_werknemers.reset_index(drop=True)
     workers['medewerker_id'] = workers['medewerker_id'].astype(str)
     
     # delete all rows where wensen = niet plannen
@@ -252,22 +223,9 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
     # Drop unnecessary columns
     workers = workers.drop(columns=['contact vanaf', 'contract tm'])
     
-    #Convert deskundigheid to list of ints
-    lsts = []
-    for i in range(len(workers)):
-        lst = []
-        if workers['deskundigheid'][i] <10:
-            lst = [int(workers['deskundigheid'][i])]
-        else:
-            lst = [int(x) for x in str(int(workers['deskundigheid'][i]))]
-        
-        lsts.append(lst)
-        
-    workers['deskundigheid'] = lsts
-
-    workers['deskundigheid'] = workers['deskundigheid'].apply(
-        lambda q: ast.literal_eval(q) if isinstance(q, str) else q
-    )
+    #Convert deskundigheid to list of ints, one per digit (e.g. 2 → [2], 23 → [2, 3])
+    workers['deskundigheid'] = workers['deskundigheid'].astype(int).astype(str).map(
+        lambda digits: [int(d) for d in digits])
     
     # Delete all employees with deskundigheid = 5 or 6
     workers = workers[~workers['deskundigheid'].apply(lambda x: isinstance(x, (list, tuple)) and (5 in x or 6 in x))]
@@ -276,7 +234,7 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
     workers['deskundigheid'] = workers['deskundigheid'].apply(lambda x: x + [3] if 7 in x and 3 not in x else x)
         
     # If contract soort = oproep, set contracturen to 0
-    workers.loc[workers['contract soort'] == 'oproep', 'contracturen'] = 0
+    workers['contracturen'] = np.where(workers['contract soort'] == 'oproep', 0, workers['contracturen'])
     
     # Normalize contract details
     workers['max_days_per_week'] = workers['max_werkdgn_pw'].fillna(0).astype(int)
@@ -285,61 +243,57 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
     workers['contract_hours'] = workers['contracturen'].fillna(0).astype(float)
     
     # if contract_hours is 0, fill with 9 * max_days_per_week
-    workers.loc[workers['contract_hours'] == 0, 'contract_hours'] = workers['max_days_per_week'] * 9
+    workers['contract_hours'] = np.where(workers['contract_hours'] == 0, workers['max_days_per_week'] * 9, workers['contract_hours'])
     
     workers['contract_minutes'] = (workers['contract_hours'] * 60).round().astype(int) 
     # Convert geboortedatum to leeftijd based on current day (round down if birthday not yet occurred this year)
     current_date = dt.datetime.now().date()
 
-    workers['leeftijd'] = workers['geboortedatum'].apply(
-        lambda x: current_date.year - x.year - ((current_date.month, current_date.day) < (x.month, x.day))
-    )
+    geboortedatum = pd.to_datetime(workers['geboortedatum'])
+    birthday_not_yet = (geboortedatum.dt.month * 100 + geboortedatum.dt.day) > (current_date.month * 100 + current_date.day)
+    workers['leeftijd'] = current_date.year - geboortedatum.dt.year - birthday_not_yet.astype(int)
         
     def parse_list(x, cast=str):
         if pd.isna(x) or str(x).strip() == '':
             return []
         return [cast(s.strip()) for s in str(x).split(',')]
 
-    workers['voorkeur_dagdelen'] = workers['voorkeur dagdelen (dag, avond, nacht)'].apply(
-    lambda x: parse_list(x, str))
-    
-    # split voorkeur_dagdelen list into three separate columns (safe for missing items)
-    workers['voorkeur_dag'] = workers['voorkeur_dagdelen'].apply(
-        lambda x: x[0].strip() if isinstance(x, (list, tuple)) and len(x) > 0 and isinstance(x[0], str) else ''
-    )
-    workers['voorkeur_avond'] = workers['voorkeur_dagdelen'].apply(
-        lambda x: x[1].strip() if isinstance(x, (list, tuple)) and len(x) > 1 and isinstance(x[1], str) else ''
-    )
-    workers['voorkeur_nacht'] = workers['voorkeur_dagdelen'].apply(
-        lambda x: x[2].strip() if isinstance(x, (list, tuple)) and len(x) > 2 and isinstance(x[2], str) else ''
-    )
-    
+    def split_list_columns(col, n):
+        # split a comma separated column into n stripped string columns ('' for missing items)
+        parts = col.fillna('').astype(str).str.split(',', expand=True)
+        parts = parts.reindex(columns=range(n)).fillna('')
+        return parts.apply(lambda c: c.str.strip())
+
+    # split voorkeur dagdelen into three separate columns (safe for missing items),
+    # lowercased once so every rule can compare against 'niet'/'uitsluitend'/'overig' directly
+    voorkeur = split_list_columns(workers['voorkeur dagdelen (dag, avond, nacht)'], 3).apply(lambda c: c.str.lower())
+    workers['voorkeur_dag'] = voorkeur[0]
+    workers['voorkeur_avond'] = voorkeur[1]
+    workers['voorkeur_nacht'] = voorkeur[2]
 
     workers['patroon'] = workers['patroon'].apply(
         lambda x: parse_list(x, int))
 
-    workers['achtereenvolgende_diensten'] = workers['achtereenvolgende diensten'].apply(
-        lambda x: parse_list(x, int))
-    
-    # split achtereenvolgende_diensten list into two separate columns named achtereenvolgende_diensten_min and achtereenvolgende_diensten_max (safe for missing items)
-    workers['min_achtereenvolgende_diensten'] = workers['achtereenvolgende_diensten'].apply(
-        lambda x: x[0] if isinstance(x, (list, tuple)) and len(x) > 0 else 0
-    )
-    workers['max_achtereenvolgende_diensten'] = workers['achtereenvolgende_diensten'].apply(
-        lambda x: x[1] if isinstance(x, (list, tuple)) and len(x) > 1 else 0
-    )
+    # split achtereenvolgende diensten into min and max columns (0 for missing items)
+    achtereenvolgend = split_list_columns(workers['achtereenvolgende diensten'], 2)
+    achtereenvolgend = achtereenvolgend.replace('', np.nan).astype(float).fillna(0).astype(int)
+    workers['min_achtereenvolgende_diensten'] = achtereenvolgend[0]
+    workers['max_achtereenvolgende_diensten'] = achtereenvolgend[1]
 
     workers['rust_na_werkperiode'] = workers['rust na werkperiode'].fillna(0).astype(int)
     
         
     print('Worker data loaded')
     # Create IDs
-    emp_ids = workers['medewerker_id'].tolist()
+    # Categories keep the input order, so emp_idx matches the position in emp_ids
+    emp_cat = pd.Categorical(workers['medewerker_id'], categories=pd.unique(workers['medewerker_id']))
+    emp_ids = emp_cat.categories.tolist()
     #emp_ids = [str(e) for e in emp_ids]
-    emp_index = {emp: i for i, emp in enumerate(emp_ids)}
+    workers['emp_idx'] = emp_cat.codes.astype(np.int32)
+    emp_index = dict(zip(emp_ids, range(len(emp_ids))))
     
     # --- onbeschikbaarheid ---
-    df_onb = df_onb.copy().reset_index(drop=True)
+    df_onb = df_onb.reset_index(drop=True)
     # drop Medewerker id, change Mw_id to Medewerker id
     df_onb = df_onb.drop(columns=['Medewerker id'], errors='ignore')
     df_onb = df_onb.rename(columns={'Mw_id':'Medewerker id'})
@@ -355,34 +309,46 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
         # Compute shift_date
         df_vastrooster['shift_date'] = start_date + pd.to_timedelta((df_vastrooster['weekvolgnr']-1)*7 + df_vastrooster['day_of_week'], unit='D')
         
-        # Map to shift_id in shifts_constant
-        def find_shift_id(row):
-            matches = shifts_constant[(shifts_constant['shift_name']==row['dienst']) & (shifts_constant['day_of_week']==row['day_of_week'])]
-            return matches['shift_id'].iloc[0] if not matches.empty else None
-        df_vastrooster['shift_id'] = df_vastrooster.apply(find_shift_id, axis=1)
+        # Map to shift_id in shifts_constant (first matching shift per dienst and weekday)
+        const_shift_ids = (
+            shifts_constant[['shift_name', 'day_of_week', 'shift_id']]
+            .drop_duplicates(['shift_name', 'day_of_week'])
+            .rename(columns={'shift_name': 'dienst'})
+        )
+        matched = df_vastrooster[['dienst', 'day_of_week']].merge(const_shift_ids, on=['dienst', 'day_of_week'], how='left')
+        df_vastrooster['shift_id'] = matched['shift_id'].to_numpy()
         
         # Append to df_onb
-        df_const_unavail = df_vastrooster[['medewerker_id','shift_date','shift_id']].copy()
-        df_const_unavail = df_const_unavail.rename(columns={'medewerker_id':'Medewerker id','shift_date':'Datum beschikbaarheid'})
-        df_const_unavail['Beschikbaarheid'] = 'Niet beschikbaar (constant schedule)'
         # beschikbaarheid tijd vanaf and t/m set to entire day
-        df_const_unavail['Beschikbaarheid tijd vanaf'] = pd.to_datetime('00:00', format='%H:%M').time()
-        df_const_unavail['Beschikbaarheid tijd t/m'] = pd.to_datetime('23:59', format='%H:%M').time()
+        n_const = len(df_vastrooster)
+        df_const_unavail = pd.DataFrame({
+            'Medewerker id': df_vastrooster['medewerker_id'].to_numpy(),
+            'Datum beschikbaarheid': df_vastrooster['shift_date'].to_numpy(),
+            'shift_id': df_vastrooster['shift_id'].to_numpy(),
+            'Beschikbaarheid': np.full(n_const, 'Niet beschikbaar (constant schedule)', dtype=object),
+            'Beschikbaarheid tijd vanaf': np.full(n_const, dt.time(0, 0), dtype=object),
+            'Beschikbaarheid tijd t/m': np.full(n_const, dt.time(23, 59), dtype=object),
+        })
         
         df_onb = pd.concat([df_onb, df_const_unavail[['Medewerker id','Datum beschikbaarheid', 'Beschikbaarheid','Beschikbaarheid tijd vanaf','Beschikbaarheid tijd t/m']]], ignore_index=True)
         
         # Subtract constant schedule hours from contract_minutes
-        for emp in df_const_unavail['Medewerker id'].unique():
-            shift_ids = df_const_unavail[df_const_unavail['Medewerker id']==emp]['shift_id'].dropna().tolist()
-            hours_to_subtract = shifts_constant.loc[shifts_constant['shift_id'].isin(shift_ids),'duration_min'].sum()
-            workers.loc[workers['medewerker_id']==emp,'contract_minutes'] -= hours_to_subtract
-            
-            print(f"Subtracted {hours_to_subtract} minutes from employee {emp} due to constant schedule.")
+        # (each distinct shift_id counts once per employee)
+        minutes_to_subtract = (
+            df_const_unavail[['Medewerker id', 'shift_id']].dropna().drop_duplicates()
+            .merge(shifts_constant[['shift_id', 'duration_min']], on='shift_id', how='left')
+            .groupby('Medewerker id')['duration_min'].sum()
+            .reindex(df_const_unavail['Medewerker id'].unique(), fill_value=0)
+        )
+        workers['contract_minutes'] -= workers['medewerker_id'].map(minutes_to_subtract).fillna(0).astype(int)
+
+        for emp, minutes in minutes_to_subtract.items():
+            print(f"Subtracted {minutes} minutes from employee {emp} due to constant schedule.")
     
     # --- onbeschikbaarheid ---
     # Convert 'Datum beschikbaarheid' to datetime
     df_onb['Datum'] = pd.to_datetime(df_onb['Datum beschikbaarheid'], format='%Y-%m-%d').dt.date
-    df_onb['Beschikbaarheid'] = df_onb['Beschikbaarheid'].fillna('Onbekend')
+    df_onb['Beschikbaarheid'] = df_onb['Beschikbaarheid'].fillna('Onbekend').astype('category')
     def ensure_time(x):
         if isinstance(x, dt.time):
             return x
@@ -404,15 +370,7 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
     dur_min = shifts.set_index('shift_id')['duration_min'].to_dict()
 
     # Grouping by week/day
-    shifts_by_week = {}
-    #shifts_by_day = {}
-    for _, r in shifts.iterrows():
-        s = int(r['shift_id'])
-        w = int(r['week'])
-        day_k = r['day_key']
-        shifts_by_week.setdefault(w, []).append(s)
-        #shifts_by_day.setdefault(day_k, []).append(s)
-
+    shifts_by_week = shifts.groupby('week')['shift_id'].apply(list).to_dict()
     shifts_by_day = shifts.groupby('absolute_day')['shift_id'].apply(list).to_dict()
     
     weeks = sorted(shifts['week'].unique().tolist())
@@ -420,12 +378,6 @@ def preprocess_data(df_werknemers: pd.DataFrame, df_rooster_template: pd.DataFra
     night_shifts = shifts.loc[shifts['is_night'], 'shift_id'].tolist()
     night_shifts_by_week = {
         w: shifts.loc[(shifts['week'] == w) & (shifts['is_night']), 'shift_id'].tolist() for w in weeks}
-    
-    # Create clean shifts dataframe
-    # Delete all rows where shifts = KOK or FM
-    shifts = shifts[~shifts['shift_name'].isin(['KOK', 'FM'])]
-    shifts = shifts.reset_index(drop=True)
-    shifts['shift_id'] = shifts.index.astype(int)
 
     return {
         "shifts": shifts,
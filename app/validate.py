@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 from datetime import timedelta
 
 def validate_auto_rooster(data, result):
@@ -24,14 +25,16 @@ def validate_auto_rooster(data, result):
     
     # Helper: quick lookup
     shifts_lookup = shifts.set_index('shift_id')
+    workers_idx = workers.drop_duplicates('medewerker_id').set_index('medewerker_id')
+    worker_attr = workers_idx.to_dict('index')
 
     # COA 7.1 exemptions: employees whose max consecutive nights differs from default 5
     COA_7_1_exempt = set()
 
     for emp in emp_ids:
         max_consec = 5
-        patroon = workers.loc[workers['medewerker_id'] == emp, 'patroon'].iloc[0]
-        voorkeur_nacht = workers.loc[workers['medewerker_id'] == emp, 'voorkeur_nacht'].iloc[0]
+        patroon = worker_attr[emp]['patroon']
+        voorkeur_nacht = worker_attr[emp]['voorkeur_nacht']
         print(f"Employee {emp} has voorkeur_nacht: {voorkeur_nacht}, patroon: {patroon}")
         
         if voorkeur_nacht == 'uitsluitend' and patroon != []:
@@ -39,127 +42,118 @@ def validate_auto_rooster(data, result):
             print(f"Employee {emp} has voorkeur_nacht 'uitsluitend' with patroon {patroon}, setting max_consec to {max_consec}.")
             COA_7_1_exempt.add(emp)
             
-    CAO_7_4_exempt = workers[workers['voorkeur_nacht'] != 'niet']['medewerker_id'].astype(str).tolist()
+    CAO_7_4_exempt = set(workers[workers['voorkeur_nacht'] != 'niet']['medewerker_id'].astype(str))
 
     ## 1) Coverage: each shift has <= 1 assigned employee
-    for sid, group in assignments_df.groupby("shift_id"):
-        if len(group) > 1:
-            errors.append(f"Shift {sid} assigned to multiple employees: {group['employee_id'].tolist()}")
+    emps_per_shift = assignments_df.groupby("shift_id")['employee_id'].agg(list)
+    for sid, emps in emps_per_shift[emps_per_shift.str.len() > 1].items():
+        errors.append(f"Shift {sid} assigned to multiple employees: {emps}")
 
     ## 2) At most one shift per employee per day
-    for (emp, date), group in assignments_df.groupby(["employee_id", "shift_date"]):
-        if len(group) > 1:
-            errors.append(f"Employee {emp} works {len(group)} shifts on {date}: {group['shift_id'].tolist()}")
+    shifts_per_day = assignments_df.groupby(["employee_id", "shift_date"])['shift_id'].agg(list)
+    for (emp, date), sids in shifts_per_day[shifts_per_day.str.len() > 1].items():
+        errors.append(f"Employee {emp} works {len(sids)} shifts on {date}: {sids}")
 
     ## 3) After night shift, no day/evening shift next day
-    for emp, group in assignments_df.groupby("employee_id"):
-        nights = group[group["is_night"]]
-        for _, ns in nights.iterrows():
-            next_day = ns['shift_date'] + timedelta(days=1)
-            next_day_shifts = group[group['shift_date'] == next_day]
-            next_day_shifts = next_day_shifts[next_day_shifts['is_night'] == False]
-            if len(next_day_shifts) > 0:
-                errors.append(f"Employee {emp} has day/evening shift(s) on {next_day} after a night shift on {ns['shift_date']}.")
+    nights = assignments_df.loc[assignments_df["is_night"] == True, ['employee_id', 'shift_date']]
+    non_nights = assignments_df.loc[assignments_df["is_night"] == False, ['employee_id', 'shift_date']].drop_duplicates()
+    night_then_day = nights.assign(next_day=nights['shift_date'] + timedelta(days=1)).merge(
+        non_nights, left_on=['employee_id', 'next_day'], right_on=['employee_id', 'shift_date'], suffixes=('', '_next'))
+    for r in night_then_day.itertuples(index=False):
+        errors.append(f"Employee {r.employee_id} has day/evening shift(s) on {r.next_day} after a night shift on {r.shift_date}.")
 
     ## 4) Max work days per week
-    for emp, group in assignments_df.groupby("employee_id"):
-        max_days = int(workers.loc[workers['medewerker_id'] == emp, 'max_days_per_week'].iloc[0])
-        for week, week_group in group.groupby("week"):
-            worked_days = week_group['shift_date'].nunique()
-            if worked_days > max_days:
-                errors.append(f"Employee {emp} exceeds max work days in week {week}: {worked_days} > {max_days}")
+    worked_days = assignments_df.groupby(["employee_id", "week"])['shift_date'].nunique()
+    max_days = worked_days.index.get_level_values('employee_id').map(workers_idx['max_days_per_week']).to_numpy()
+    for (emp, week), days, cap in zip(worked_days.index, worked_days, max_days):
+        if days > cap:
+            errors.append(f"Employee {emp} exceeds max work days in week {week}: {days} > {int(cap)}")
 
     ## 5) Contract hours on average across all weeks
     num_weeks = assignments_df['week'].nunique()
-    for emp, group in assignments_df.groupby("employee_id"):
-        cap_minutes = int(workers.loc[workers['medewerker_id'] == emp, 'contract_minutes'].iloc[0])
-        total_minutes = group['duration_min'].sum()
-        allowed_total = cap_minutes * num_weeks
-        if total_minutes > allowed_total:
+    total_minutes = assignments_df.groupby("employee_id")['duration_min'].sum()
+    allowed_total = total_minutes.index.map(workers_idx['contract_minutes']).to_numpy() * num_weeks
+    for emp, worked, allowed in zip(total_minutes.index, total_minutes, allowed_total):
+        if worked > allowed:
             errors.append(
                 f"Employee {emp} exceeds average contract hours: "
-                f"{total_minutes} min worked > {allowed_total} min allowed over {num_weeks} weeks"
+                f"{worked} min worked > {int(allowed)} min allowed over {num_weeks} weeks"
             )
 
     ## 6) No shifts overlapping with unavailable times
-    for _, r in onb.iterrows():
-        emp = r['Medewerker id']
-        if emp not in workers['medewerker_id'].values:
-            continue
-
-        besch = r['Beschikbaarheid'].lower()
-        if besch == 'beschikbaar':
-            continue
-
-        date_unb = r['Datum']
-        start_unb = r.get('Beschikbaarheid_tijd_vanaf')
-        end_unb = r.get('Beschikbaarheid_tijd_tm')
-
-        emp_shifts = assignments_df[assignments_df["employee_id"] == emp]
-        for _, sr in emp_shifts.iterrows():
-            if sr['shift_date'] != date_unb:
-                continue
+    # join assignments to unavailability rows on (employee, date); onb['Datum'] holds date objects
+    onb_unavail = onb[onb['Medewerker id'].isin(worker_attr.keys()) &
+                      (onb['Beschikbaarheid'].astype(str).str.lower() != 'beschikbaar')]
+    onb_unavail = onb_unavail.assign(day=pd.to_datetime(onb_unavail['Datum']))[
+        ['Medewerker id', 'day', 'Datum', 'Beschikbaarheid_tijd_vanaf', 'Beschikbaarheid_tijd_tm']]
+    unavail_hits = assignments_df.assign(day=pd.to_datetime(assignments_df['shift_date']).dt.normalize()).merge(
+        onb_unavail, left_on=['employee_id', 'day'], right_on=['Medewerker id', 'day'])
+
+    fully_unavailable = unavail_hits['Beschikbaarheid_tijd_vanaf'].isna() | unavail_hits['Beschikbaarheid_tijd_tm'].isna()
+    for sr in unavail_hits[fully_unavailable].itertuples(index=False):
+        errors.append(f"Employee {sr.employee_id} scheduled on fully unavailable day {sr.Datum}, shift {sr.shift_id}.")
+
+    timed = unavail_hits[~fully_unavailable]
+    overlap = ~((timed['end_time'] <= timed['Beschikbaarheid_tijd_vanaf']) | (timed['start_time'] >= timed['Beschikbaarheid_tijd_tm']))
+    for sr in timed[overlap].itertuples(index=False):
+        errors.append(
+            f"Employee {sr.employee_id} scheduled during unavailable time on {sr.Datum}, "
+            f"shift {sr.shift_id} ({sr.start_time}–{sr.end_time} overlaps with {sr.Beschikbaarheid_tijd_vanaf}–{sr.Beschikbaarheid_tijd_tm})."
+        )
+
+    # night blocks per employee: run-lengths over the sorted night dates (diff != 1 day starts a new run)
+    night_runs = {}
+    for emp, emp_nights in assignments_df.loc[assignments_df['is_night'] == True].groupby("employee_id")['shift_date']:
+        night_dates = np.unique(emp_nights.to_numpy().astype('datetime64[D]'))
+        run_id = np.concatenate([[0], (np.diff(night_dates).astype(int) != 1).cumsum()])
+        night_runs[emp] = np.split(night_dates, np.flatnonzero(np.diff(run_id)) + 1)
+
+    ## 7.1) Max 5 consecutive nights (one error per too-long run, listing all its nights)
+    for emp, runs in night_runs.items():
+        max_consec = 7 if emp in COA_7_1_exempt else 5
+        for run in runs:
+            if len(run) > max_consec:
+                errors.append(f"Employee {emp} works >{max_consec} consecutive nights: {[pd.Timestamp(d) for d in run]}")
 
-            if pd.isna(start_unb) or pd.isna(end_unb):
-                errors.append(f"Employee {emp} scheduled on fully unavailable day {date_unb}, shift {sr['shift_id']}.")
+    ## 7.2) After ≥3 consecutive nights → 46h rest (next 2 days off)
+    assignment_days = assignments_df['shift_date'].to_numpy().astype('datetime64[D]')
+    for emp, runs in night_runs.items():
+        emp_mask = (assignments_df['employee_id'] == emp).to_numpy()
+        for run in runs:
+            if len(run) < 3:
                 continue
-
-            overlap = not (sr['end_time'] <= start_unb or sr['start_time'] >= end_unb)
-            if overlap:
+            blocked_days = run[-1] + np.arange(1, 3)
+            next_shifts = assignments_df.loc[emp_mask & np.isin(assignment_days, blocked_days), 'shift_id']
+            if len(next_shifts) > 0:
+                d0, d1, d2 = (pd.Timestamp(d) for d in run[-3:])
                 errors.append(
-                    f"Employee {emp} scheduled during unavailable time on {date_unb}, "
-                    f"shift {sr['shift_id']} ({sr['start_time']}–{sr['end_time']} overlaps with {start_unb}–{end_unb})."
+                    f"Employee {emp} has shifts {next_shifts.tolist()} within 46h rest after nights {d0}, {d1}, {d2}."
                 )
 
-    ## 7.1) Max 5 consecutive nights
-    for emp, group in assignments_df.groupby("employee_id"):
-        emp_nights = group[group['is_night']].sort_values("shift_date")
-        dates = emp_nights['shift_date'].tolist()
-        max_consec = 7 if emp in COA_7_1_exempt else 5
-        for i in range(len(dates) - max_consec):
-            window = dates[i:i+max_consec+1]
-            if (window[-1] - window[0]).days == max_consec:
-                errors.append(f"Employee {emp} works >{max_consec} consecutive nights: {window}")
-
-    ## 7.2) After ≥3 consecutive nights → 46h rest (next 2 days off)
-    for emp, group in assignments_df.groupby("employee_id"):
-        emp_nights = group[group['is_night']].sort_values("shift_date")
-        night_dates = emp_nights["shift_date"].tolist()
-
-        for i in range(len(night_dates) - 2):
-            d0, d1, d2 = night_dates[i:i+3]
-            if d1 == d0 + timedelta(days=1) and d2 == d1 + timedelta(days=1):
-                next_day = d2 + timedelta(days=1)
-                if next_day in night_dates:  # still part of a longer block
-                    continue
-                blocked_days = [next_day, next_day + timedelta(days=1)]
-                next_shifts = group[group["shift_date"].isin(blocked_days)]
-                if len(next_shifts) > 0:
-                    errors.append(
-                        f"Employee {emp} has shifts {next_shifts['shift_id'].tolist()} within 46h rest after nights {d0}, {d1}, {d2}."
-                    )
-
     ## 7.3) Max 35 nights per 13 weeks
-    for emp, group in assignments_df.groupby("employee_id"):
-        emp_nights = group[group['is_night']]
-        for start_week in range(shifts['week'].min(), shifts['week'].max()-12):
-            window = emp_nights[(emp_nights['week'] >= start_week) & (emp_nights['week'] < start_week+13)]
-            if len(window) > 35:
-                errors.append(f"Employee {emp} has {len(window)} nights in weeks {start_week}-{start_week+12} (> 35).")
+    night_assignments = assignments_df[assignments_df['is_night'] == True]
+    nights_per_week = night_assignments.groupby(['employee_id', 'week']).size().unstack(fill_value=0)
+    nights_per_week = nights_per_week.reindex(columns=range(shifts['week'].min(), shifts['week'].max() + 1), fill_value=0)
+    for start_week in range(shifts['week'].min(), shifts['week'].max()-12):
+        window_nights = nights_per_week.loc[:, start_week:start_week + 12].sum(axis=1)
+        for emp, n in window_nights[window_nights > 35].items():
+            errors.append(f"Employee {emp} has {n} nights in weeks {start_week}-{start_week+12} (> 35).")
+
+    night_ids_by_emp = night_assignments.groupby('employee_id')['shift_id'].agg(list)
 
     ## 7.4) Age > 55: no night shifts
-    for emp, group in assignments_df.groupby("employee_id"):
+    for emp, night_ids in night_ids_by_emp.items():
         if emp in CAO_7_4_exempt:
             continue
-        leeftijd = int(workers.loc[workers['medewerker_id'] == emp, 'leeftijd'].iloc[0])
-        if leeftijd > 55 and group['is_night'].any():
-            errors.append(f"Employee {emp} (age {leeftijd}) assigned to night shifts: {group[group['is_night']==True]['shift_id'].tolist()}")
+        leeftijd = int(worker_attr[emp]['leeftijd'])
+        if leeftijd > 55:
+            errors.append(f"Employee {emp} (age {leeftijd}) assigned to night shifts: {night_ids}")
     
     # If voorkeur_nacht is 'niet', no night shifts
-    for emp, group in assignments_df.groupby("employee_id"):
-        voorkeur_nacht = workers.loc[workers['medewerker_id'] == emp, 'voorkeur_nacht'].iloc[0]
-        if voorkeur_nacht == 'niet' and group['is_night'].any():
-            errors.append(f"Employee {emp} has 'niet' voorkeur_nacht but assigned to night shifts: {group[group['is_night']==True]['shift_id'].tolist()}")
+    for emp, night_ids in night_ids_by_emp.items():
+        voorkeur_nacht = worker_attr[emp]['voorkeur_nacht']
+        if voorkeur_nacht == 'niet':
+            errors.append(f"Employee {emp} has 'niet' voorkeur_nacht but assigned to night shifts: {night_ids}")
     
     if errors:
         print(f"=== VALIDATION FAILED: {len(errors)} issue(s) ===")
@@ -1,9 +1,18 @@
 import os
 import tempfile
 import pandas as pd
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, request, jsonify, send_file, render_template, abort
 import csv
 import traceback
+import io
+import hashlib
+import re
+import gzip
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 
 from app import preprocess_data, auto_rooster, validate_auto_rooster
@@ -13,38 +22,165 @@ app.config["MAX_CONTENT_LENGTH"] = 30 * 1024 * 1024  # 30 MB upload limit
 app.template_folder = os.path.join(os.path.dirname(__file__), "templates")
 
 ALLOWED_EXT = {"csv", "xlsx"}
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"  # python-calamine (Rust) parser, faster than openpyxl on the uploaded workbooks
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
 
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXT
 
+CSV_SNIFF_BYTES = 64 * 1024  # the delimiter is sniffed from the head of the upload only
+
 def read_dataframe(file_storage):
-    content = file_storage.read()
+    if file_storage.filename.lower().endswith("xlsx"):
+        return pd.read_excel(file_storage, engine=EXCEL_ENGINE)
+
+    sample = file_storage.read(CSV_SNIFF_BYTES)
     file_storage.seek(0)
     try:
-        dialect = csv.Sniffer().sniff(content.decode('utf-8'))
+        # a multi-byte character may be cut at the end of the sample
+        dialect = csv.Sniffer().sniff(sample.decode('utf-8', errors='ignore'))
         sep = dialect.delimiter
     except Exception:
         sep = ','
-
-    if file_storage.filename.lower().endswith("xlsx"):
-        return pd.read_excel(file_storage)
     return pd.read_csv(file_storage, sep=sep)
 
-def read_workers(file_storage):
-    return pd.read_excel(file_storage, sheet_name='Tabellen', usecols='T:AH', skiprows=1)
+def open_workbook(file_storage):
+    # parse the uploaded workbook container once; the read_* helpers take sheets from it
+    # (pandas already opens openpyxl workbooks with read_only=True, data_only=True)
+    return pd.ExcelFile(file_storage, engine=EXCEL_ENGINE)
+
+# Text columns that preprocess_data reads as strings; typed up front so pandas skips inference on them.
+# Date and time columns keep the default parsing, preprocess_data parses them with explicit formats.
+WORKERS_DTYPES = {'medewerker_id': str, 'medewerker_naam': str, 'wensen': str, 'contract soort': str,
+                  'voorkeur dagdelen (dag, avond, nacht)': str, 'patroon': str, 'achtereenvolgende diensten': str}
+VAST_ROOSTER_DTYPES = {'medewerker_id': str, 'dag': str, 'dienst': str}
+# Mw_id keeps the default inference: preprocess_data matches it against medewerker_id as read.
+ONB_DTYPES = {'Beschikbaarheid': str, 'Team medewerker': str}
+PREV_DTYPES = {'Dienst': str, 'Team medewerker': str}
+
+def read_workers(xls):
+    return xls.parse(sheet_name='Tabellen', usecols='T:AH', skiprows=1, dtype=WORKERS_DTYPES)
+
+def read_rooster_template(xls):
+    return xls.parse(sheet_name="Tabellen", usecols="E:P", skiprows=1)
+
+def read_vast_rooster(xls):
+    return xls.parse(sheet_name='Vaste roosters', usecols='A:E', skiprows=1, dtype=VAST_ROOSTER_DTYPES)
+
+def team_as_category(df):
+    # few distinct teams over many rows: store as categorical so filter_team compares integer codes
+    if 'Team medewerker' in df.columns:
+        df['Team medewerker'] = df['Team medewerker'].astype('category')
+    return df
+
+def filter_team(df, team):
+    # keep only rows of the selected 'Team medewerker' (no filter when team is empty)
+    if not team:
+        return df
+    teams = df['Team medewerker'].astype('category')  # no-op for frames from the read_* helpers
+    if team not in teams.cat.categories:
+        return df.iloc[:0]
+    return df.loc[teams.cat.codes.to_numpy() == teams.cat.categories.get_loc(team)]
+
+def read_onb(xls):
+    return team_as_category(xls.parse(sheet_name='Aanlevering onbeschikbaarheid p', dtype=ONB_DTYPES))
 
-def read_rooster_template(file_storage):
-    return pd.read_excel(file_storage, sheet_name="Tabellen", usecols="E:P", skiprows=1)
+def read_teams(xls):
+    # only the team column of the availability sheet (a frame without it when the column is missing)
+    return xls.parse(sheet_name='Aanlevering onbeschikbaarheid p', usecols=lambda c: c == 'Team medewerker',
+                     dtype={'Team medewerker': str})
 
-def read_vast_rooster(file_storage):
-    return pd.read_excel(file_storage, sheet_name='Vaste roosters', usecols='A:E', skiprows=1)
+def read_prev_assignments(xls):
+    return team_as_category(xls.parse(sheet_name='Aanlevering diensten', dtype=PREV_DTYPES))
 
-def read_onb(file_storage):
-    return pd.read_excel(file_storage, sheet_name='Aanlevering onbeschikbaarheid p')
+def read_workers_workbook(file_storage):
+    with open_workbook(file_storage) as xls:
+        return read_workers(xls), read_rooster_template(xls), read_vast_rooster(xls)
 
-def read_prev_assignments(file_storage):
-    return pd.read_excel(file_storage, sheet_name='Aanlevering diensten')
+def read_onb_workbook(file_storage):
+    # unfiltered: the cached frames serve every team, generate_schedule applies filter_team
+    with open_workbook(file_storage) as xls:
+        return read_onb(xls), read_prev_assignments(xls)
+
+# Parsed sheets of recent uploads, keyed by (reader, content hash): re-submitting the same
+# workbooks (e.g. for another team) skips the Excel parse. Oldest entries are evicted first.
+WORKBOOK_CACHE_SIZE = 8
+workbook_cache = OrderedDict()
+workbook_cache_lock = threading.Lock()
+
+def read_workbook_cached(file_storage, reader):
+    content = file_storage.read()
+    key = (reader.__name__, hashlib.blake2b(content, digest_size=16).hexdigest())
+    with workbook_cache_lock:
+        frames = workbook_cache.get(key)
+        if frames is not None:
+            workbook_cache.move_to_end(key)
+    if frames is None:
+        frames = reader(io.BytesIO(content))
+        with workbook_cache_lock:
+            workbook_cache[key] = frames
+            while len(workbook_cache) > WORKBOOK_CACHE_SIZE:
+                workbook_cache.popitem(last=False)
+    # preprocess_data modifies its input frames, hand out copies
+    return tuple(df.copy() for df in frames)
+
+# Result CSVs of recent requests, keyed by download name, served straight from memory.
+# Each result is also written to RESULT_DIR: gunicorn runs several worker processes and the
+# download may reach a different process than the one that solved.
+RESULT_CACHE_SIZE = 16
+RESULT_DIR = os.path.join(tempfile.gettempdir(), "rooster_cache")
+RESULT_MAX_AGE_S = 3600
+RESULT_NAME_RE = re.compile(r"[0-9a-f]{32}\.csv\.gz")
+os.makedirs(RESULT_DIR, mode=0o700, exist_ok=True)
+result_cache = OrderedDict()
+result_cache_lock = threading.Lock()
+
+def save_result(content):
+    # store gzip-compressed (level 1: cheap, CSV compresses well) under a fresh uuid name,
+    # dropping result files older than RESULT_MAX_AGE_S
+    content = gzip.compress(content, compresslevel=1)
+    cutoff = time.time() - RESULT_MAX_AGE_S
+    for entry in os.scandir(RESULT_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass  # already removed by another worker
+    name = f"{uuid.uuid4().hex}.csv.gz"
+    with open(os.path.join(RESULT_DIR, name), "wb") as f:
+        f.write(content)
+    remember_result(name, content)
+    return name
+
+def remember_result(name, content):
+    with result_cache_lock:
+        result_cache[name] = content
+        while len(result_cache) > RESULT_CACHE_SIZE:
+            result_cache.popitem(last=False)
+
+def cached_result(name):
+    with result_cache_lock:
+        return result_cache.get(name)
+
+def send_result(gz_content):
+    # clients accepting gzip get the stored bytes as-is, others the decompressed CSV
+    if "gzip" in request.accept_encodings:
+        response = send_file(io.BytesIO(gz_content),
+                             mimetype="text/csv",
+                             as_attachment=True,
+                             download_name='Rooster.csv')
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = send_file(io.BytesIO(gzip.decompress(gz_content)),
+                             mimetype="text/csv",
+                             as_attachment=True,
+                             download_name='Rooster.csv')
+    response.vary.add("Accept-Encoding")
+    return response
 
 @app.route("/", methods=["GET"])
 def index():
@@ -57,7 +193,8 @@ def get_teams():
         if not onb_file:
             return jsonify({"error": "No file provided"}), 400
 
-        df = read_onb(onb_file)
+        with open_workbook(onb_file) as xls:
+            df = read_teams(xls)
 
         if "Team medewerker" not in df.columns:
             return jsonify({"error": "Column 'Team medewerker' missing"}), 400
@@ -79,23 +216,22 @@ def generate_schedule():
                 return jsonify({"error": f"Missing required file: {rf}"}), 400
 
         #workers_df = read_dataframe(request.files["workers"])\
-        workers_df = read_workers(request.files["workers_rooster_template_vast_rooster"])
-        rooster_template_df = read_rooster_template(request.files["workers_rooster_template_vast_rooster"])
-        vast_rooster_df = read_vast_rooster(request.files["workers_rooster_template_vast_rooster"])
-        onb_df = read_onb(request.files["onb_vorig_rooster"])
-        prev_df = read_prev_assignments(request.files["onb_vorig_rooster"])
-        print(prev_df.head())
+        # the two workbooks are independent: parse them side by side
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            workers_future = pool.submit(read_workbook_cached, request.files["workers_rooster_template_vast_rooster"], read_workers_workbook)
+            onb_future = pool.submit(read_workbook_cached, request.files["onb_vorig_rooster"], read_onb_workbook)
+            workers_df, rooster_template_df, vast_rooster_df = workers_future.result()
+            onb_df, prev_df = onb_future.result()
+
+        #Filter onb_df and prev_df based on a dropdown selection for column 'Team medewerker' (cached frames are unfiltered)
+        team_filter = request.form.get("team_filter", None)
+        onb_df = filter_team(onb_df, team_filter)
+        prev_df = filter_team(prev_df, team_filter)
         # if no prev_assignments provided, set to None
         #if request.files["prev_assignments"].filename == "":
         #    prev_df = None
         #else:    
         #    prev_df = read_dataframe(request.files["prev_assignments"])
-
-        #Filter onb_df based on a dropdown selection for column 'Team medewerker'
-        team_filter = request.form.get("team_filter", None)
-        if team_filter:
-            onb_df = onb_df[onb_df['Team medewerker'] == team_filter]
-            prev_df = prev_df[prev_df['Team medewerker'] == team_filter]
         
         
                 
@@ -113,20 +249,23 @@ def generate_schedule():
         if errors:
             return jsonify({"status": "failed", "validation_errors": errors}), 400
 
-        # --- 4. Save CSV to temp file ---
-        tmpfile = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
-        assignments_df.to_csv(tmpfile.name, index=False)
-        tmpfile.flush()
+        # --- 4. Save CSV in memory (and to RESULT_DIR for other worker processes) ---
+        result_name = save_result(assignments_df.to_csv(index=False).encode("utf-8"))
     
         # --- 5. Return stats as JSON ---
+        filled_mask = assignments_df["shift_filled"].to_numpy(dtype=bool)
+        filled = int(filled_mask.sum())
+        # unfilled rows have no employee_id, count distinct employees over the filled rows only
+        num_employees = int(pd.unique(assignments_df["employee_id"].to_numpy()[filled_mask]).size)
+        shift_dates = assignments_df["shift_date"].to_numpy()
         stats = {
-            "start_date": assignments_df["shift_date"].min().date().isoformat(),
-            "end_date": assignments_df["shift_date"].max().date().isoformat(),
+            "start_date": pd.Timestamp(shift_dates.min()).date().isoformat(),
+            "end_date": pd.Timestamp(shift_dates.max()).date().isoformat(),
             "total_shifts": len(data["shifts"]),
-            "num_employees": assignments_df["employee_id"].nunique(),
-            "shifts_filled": int(assignments_df["shift_filled"].sum()),
-            "shifts_unfilled": len(data["shifts"]) - int(assignments_df["shift_filled"].sum()),
-            "download_url": f"/download/{os.path.basename(tmpfile.name)}"
+            "num_employees": num_employees,
+            "shifts_filled": filled,
+            "shifts_unfilled": len(data["shifts"]) - filled,
+            "download_url": f"/download/{result_name}"
         }
     
 
@@ -139,12 +278,22 @@ def generate_schedule():
 
 @app.route("/download/<filename>", methods=["GET"])
 def download_file(filename):
-    return send_file(os.path.join(tempfile.gettempdir(), filename),
-                     as_attachment=True,
-                     download_name='Rooster.csv')  # Force download with a generic name
+    content = cached_result(filename)
+    if content is not None:
+        return send_result(content)
+    # solved by another worker process: read its file, only names save_result gave out
+    if not RESULT_NAME_RE.fullmatch(filename):
+        abort(404)
+    path = os.path.join(RESULT_DIR, filename)
+    if not os.path.isfile(path):
+        abort(404)
+    with open(path, "rb") as f:
+        return send_result(f.read())
     
 
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
-    app.run(host="0.0.0.0", port=port, debug=True)
+    # development server only; the docker image serves the app with gunicorn
+    debug = os.environ.get("FLASK_DEBUG", "0").lower() in {"1", "true", "yes"}
+    app.run(host="0.0.0.0", port=port, debug=debug)